@@ -3,15 +3,71 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import hashlib
+import json
+import mmap
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, NamedTuple, TypedDict, cast
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
 _TEMPLATE_FILENAME = "resources/gitignore-template.txt"
+_DIGEST_SIZE = 16
+# Raw reads and writes must bypass the CRT's text-mode newline translation on
+# Windows.
+if sys.platform == "win32":
+    _READ_FLAGS = os.O_RDONLY | os.O_BINARY
+    _WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_BINARY
+else:
+    _READ_FLAGS = os.O_RDONLY
+    _WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+# Below this size a plain read is cheaper than setting up a mapping.
+_MMAP_THRESHOLD = 4096
+_MAX_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+# Well-known tool and build output directories that never hold a workspace repo.
+_SKIP_DIRS = frozenset(
+    {
+        "node_modules",
+        "target",
+        "__pycache__",
+        "venv",
+        ".venv",
+        "build",
+        "dist",
+        ".tox",
+        ".mypy_cache",
+        ".pytest_cache",
+    },
+)
+
+# Template contents keyed by path, validated against (mtime_ns, size) so that
+# repeated main() calls from a batch driver only pay a stat.
+_TEMPLATE_CACHE: dict[Path, tuple[tuple[int, int], str]] = {}
+
+
+class _RepoEntry(NamedTuple):
+    """A discovered repository and, when ``prefetched``, its .gitignore stat.
+
+    ``gitignore`` is None when the file is missing or was not prefetched.
+    """
+
+    path: str
+    gitignore: os.stat_result | None
+    prefetched: bool
+
+
+class _IndexRecord(TypedDict):
+    """Last known state of a repository's .gitignore after a successful sync."""
+
+    template_sha: str
+    target_mtime_ns: int
+    target_size: int
 
 
 @dataclass(slots=True)
@@ -20,92 +76,341 @@ class CLIArgs:
     template: Path
     dry_run: bool
     quiet: bool
+    use_cache: bool
+    include_hidden: bool
 
 
 @dataclass(slots=True)
 class SyncResult:
-    created: list[Path]
-    updated: list[Path]
-    unchanged: list[Path]
+    """Changed repository paths, kept as plain strings, plus a count of the rest."""
+
+    created: list[str]
+    updated: list[str]
+    unchanged_count: int
 
     def log(self) -> None:
         """Emit a concise summary of the sync operation."""
 
-        if self.created:
-            print("[gitignore-sync] created:")
-            for path in self.created:
-                print(f"  - {path}")
-        if self.updated:
-            print("[gitignore-sync] updated:")
-            for path in self.updated:
-                print(f"  - {path}")
         if not self.created and not self.updated:
             print("[gitignore-sync] all repositories already match template")
+            return
+        # Build the whole summary first so stdout sees a single write.
+        lines: list[str] = []
+        if self.created:
+            lines.append("[gitignore-sync] created:")
+            lines.extend(f"  - {path}" for path in sorted(self.created))
+        if self.updated:
+            lines.append("[gitignore-sync] updated:")
+            lines.extend(f"  - {path}" for path in sorted(self.updated))
+        lines.append("")
+        sys.stdout.write("\n".join(lines))
 
 
-def _discover_repositories(root: Path) -> list[Path]:
-    """Return workspace directories that contain a git repository."""
+def _stat_or_none(path: str) -> os.stat_result | None:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
 
-    repos: list[Path] = []
-    if (root / ".git").exists():
-        repos.append(root)
-    for candidate in root.iterdir():
-        if not candidate.is_dir():
-            continue
-        if candidate.name.startswith("."):
-            continue
-        if (candidate / ".git").exists():
-            repos.append(candidate)
-    return sorted(repos)
+
+def _probe_repo(path: str) -> _RepoEntry | None:
+    """Return an entry for ``path`` if it holds a ``.git`` entry.
+
+    On Windows the directory listing already carries the .gitignore metadata,
+    so it is prefetched. Elsewhere it would cost a serial stat per repository,
+    which is left to the sync worker threads instead.
+    """
+
+    if sys.platform == "win32":
+        # A directory listing (FindFirstFileExW) is far cheaper than the
+        # CreateFileW round-trip behind a direct existence check, and it
+        # already carries the .gitignore metadata.
+        has_git = False
+        gitignore: os.stat_result | None = None
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name == ".git":
+                        has_git = True
+                    elif entry.name == ".gitignore":
+                        gitignore = entry.stat()
+                    else:
+                        continue
+                    if has_git and gitignore is not None:
+                        break
+        except OSError:
+            return None
+        return _RepoEntry(path, gitignore, prefetched=True) if has_git else None
+    if not os.path.lexists(os.path.join(path, ".git")):
+        return None
+    return _RepoEntry(path, None, prefetched=False)
+
+
+def _discover_repositories(root: str, *, include_hidden: bool = False) -> list[_RepoEntry]:
+    """Return workspace repositories in listing order.
+
+    Hidden directories and ``_SKIP_DIRS`` are ignored unless ``include_hidden``.
+    """
+
+    found: list[_RepoEntry] = []
+    root_repo = _probe_repo(root)
+    if root_repo is not None:
+        found.append(root_repo)
+    # Bind globals and bound methods to locals once: the loop below runs for
+    # every workspace sibling and local lookups are markedly cheaper.
+    # With include_hidden both filters degrade to no-ops (entry names are never
+    # empty, so ``name[:1]`` never equals ""), keeping the flag out of the loop.
+    skip: frozenset[str] = frozenset() if include_hidden else _SKIP_DIRS
+    hidden_prefix = "" if include_hidden else "."
+    probe = _probe_repo
+    append = found.append
+    with os.scandir(root) as entries:
+        for entry in entries:
+            name = entry.name
+            if name[:1] == hidden_prefix or name in skip:
+                continue
+            # DirEntry.is_dir is answered from the directory listing itself, so
+            # only symlinked siblings cost an extra stat here.
+            if not entry.is_dir():
+                continue
+            repo = probe(entry.path)
+            if repo is not None:
+                append(repo)
+    return found
 
 
 def _load_template(path: Path) -> str:
     try:
-        return path.read_text(encoding="utf-8")
+        stat = path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = _TEMPLATE_CACHE.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        template = path.read_text(encoding="utf-8")
     except FileNotFoundError as exc:
         msg = f"template file not found: {path}"
         raise FileNotFoundError(msg) from exc
+    _TEMPLATE_CACHE[path] = (key, template)
+    return template
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=_DIGEST_SIZE).digest()
+
+
+def _matches_template(path: str, template_bytes: bytes) -> bool:
+    """Return True when ``path`` holds exactly ``template_bytes``.
+
+    Small files are read with at most one byte beyond the template so an
+    oversized file is rejected without being loaded; large ones are mapped and
+    compared in place. Either way raw bytes are compared without decoding.
+    A file removed since it was stat'ed counts as a mismatch.
+    """
 
+    expected = len(template_bytes)
+    try:
+        fd = os.open(path, _READ_FLAGS)
+    except FileNotFoundError:
+        return False
+    try:
+        if expected > _MMAP_THRESHOLD:
+            return _mapped_matches(fd, template_bytes)
+        data = os.read(fd, expected + 1)
+        while len(data) < expected:
+            chunk = os.read(fd, expected + 1 - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data == template_bytes
+
+
+def _mapped_matches(fd: int, template_bytes: bytes) -> bool:
+    # The caller's size check may come from a discovery-time stat; re-check on
+    # the open descriptor so a file truncated since then (mmap rejects empty
+    # files) simply counts as different.
+    if os.fstat(fd).st_size != len(template_bytes):
+        return False
+    with (
+        mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped,
+        memoryview(mapped) as view,
+    ):
+        return view == template_bytes
+
+
+def _write_template(path: str, template_bytes: bytes) -> None:
+    """Write the pre-encoded template with a bare open/write/close."""
+
+    # 0o666 matches open(): the process umask still decides the final mode.
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(template_bytes)
+        while view:
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
+
+
+def _default_index_path() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return base / "x_make_gitignore_sync_x" / "index.json"
+
+
+def _load_index(path: Path) -> dict[str, _IndexRecord]:
+    """Read the sync index, treating a missing or malformed file as empty."""
+
+    try:
+        raw = cast("object", json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    index: dict[str, _IndexRecord] = {}
+    for key, value in cast("dict[object, object]", raw).items():
+        if not isinstance(key, str) or not isinstance(value, dict):
+            continue
+        record = cast("dict[str, object]", value)
+        sha = record.get("template_sha")
+        mtime_ns = record.get("target_mtime_ns")
+        size = record.get("target_size")
+        if isinstance(sha, str) and isinstance(mtime_ns, int) and isinstance(size, int):
+            index[key] = _IndexRecord(
+                template_sha=sha,
+                target_mtime_ns=mtime_ns,
+                target_size=size,
+            )
+    return index
+
+
+def _save_index(path: Path, index: dict[str, _IndexRecord]) -> None:
+    """Persist the sync index atomically; failures only cost a cache miss next run."""
+
+    scratch = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        scratch.write_text(json.dumps(index, sort_keys=True), encoding="utf-8")
+        scratch.replace(path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            scratch.unlink(missing_ok=True)
+
+
+def _template_encodings(template_bytes: bytes) -> tuple[bytes, tuple[bytes, ...]]:
+    """Return the bytes to write and every encoding that counts as in sync.
+
+    Mirrors text-mode I/O: LF and CRLF copies (e.g. Git ``autocrlf``
+    checkouts) both match, and new files get the platform's line endings.
+    """
 
-def _sync_repo(repo: Path, template: str, *, dry_run: bool) -> str | None:
+    crlf_bytes = template_bytes.replace(b"\n", b"\r\n")
+    if sys.platform == "win32":
+        payload, fallback = crlf_bytes, template_bytes
+    else:
+        payload, fallback = template_bytes, crlf_bytes
+    return payload, (payload,) if fallback == payload else (payload, fallback)
+
+
+def _sync_repo(
+    repo: str,
+    current: os.stat_result | None,
+    payload: bytes,
+    accepted: tuple[bytes, ...],
+    *,
+    dry_run: bool,
+) -> str | None:
     """Apply the template to a single repository.
 
-    Returns "created", "updated", or None if unchanged.
+    ``current`` is the stat of the existing .gitignore (None when missing),
+    ``payload`` is what gets written and ``accepted`` lists the encodings that
+    already count as in sync. Returns "created", "updated", or None if unchanged.
     """
 
-    target = repo / ".gitignore"
-    if not target.exists():
-        if dry_run:
-            return "created"
-        target.write_text(template, encoding="utf-8")
+    target = os.path.join(repo, ".gitignore")
+    if current is None:
+        if not dry_run:
+            _write_template(target, payload)
         return "created"
 
-    current = target.read_text(encoding="utf-8")
-    if current == template:
-        return None
-
-    if dry_run:
-        return "updated"
+    # A size mismatch already proves the contents differ; skip the read.
+    for expected in accepted:
+        if current.st_size == len(expected) and _matches_template(target, expected):
+            return None
 
-    target.write_text(template, encoding="utf-8")
+    if not dry_run:
+        _write_template(target, payload)
     return "updated"
 
 
-def _sync_all(repos: Iterable[Path], template: str, *, dry_run: bool) -> SyncResult:
-    created: list[Path] = []
-    updated: list[Path] = []
-    unchanged: list[Path] = []
+def _sync_all(
+    repos: Iterable[_RepoEntry],
+    template: str,
+    *,
+    dry_run: bool,
+    index: dict[str, _IndexRecord] | None = None,
+) -> SyncResult:
+    """Sync every repository, consulting and refreshing ``index`` when given.
+
+    A prefetched .gitignore stat is reused; otherwise the worker stats it.
+    """
+
+    created: list[str] = []
+    updated: list[str] = []
+    unchanged_count = 0
 
-    for repo in repos:
-        outcome = _sync_repo(repo, template, dry_run=dry_run)
+    template_bytes = template.encode("utf-8")
+    template_sha = _digest(template_bytes).hex()
+    payload, accepted = _template_encodings(template_bytes)
+    known = index if index is not None else {}
+
+    def _apply(item: _RepoEntry) -> tuple[str, str | None, _IndexRecord | None]:
+        repo = item.path
+        if item.prefetched:
+            current = item.gitignore
+        else:
+            current = _stat_or_none(os.path.join(repo, ".gitignore"))
+        record = known.get(repo)
+        if (
+            current is not None
+            and record is not None
+            and record["template_sha"] == template_sha
+            and record["target_mtime_ns"] == current.st_mtime_ns
+            and record["target_size"] == current.st_size
+        ):
+            return repo, None, record
+        outcome = _sync_repo(repo, current, payload, accepted, dry_run=dry_run)
+        if dry_run:
+            return repo, outcome, None
+        if outcome is not None or current is None:
+            current = os.stat(os.path.join(repo, ".gitignore"))
+        return (
+            repo,
+            outcome,
+            _IndexRecord(
+                template_sha=template_sha,
+                target_mtime_ns=current.st_mtime_ns,
+                target_size=current.st_size,
+            ),
+        )
+
+    # Each repository is independent and the work is I/O-bound, so overlap the
+    # reads and writes. Executor.map yields in input order, keeping the result
+    # lists deterministic.
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        outcomes = list(executor.map(_apply, repos))
+
+    for repo, outcome, record in outcomes:
+        if index is not None and record is not None:
+            index[repo] = record
         if outcome == "created":
             created.append(repo)
         elif outcome == "updated":
             updated.append(repo)
         else:
-            unchanged.append(repo)
+            unchanged_count += 1
 
-    return SyncResult(created=created, updated=updated, unchanged=unchanged)
+    return SyncResult(created=created, updated=updated, unchanged_count=unchanged_count)
 
 
 def _parse_args(argv: list[str]) -> CLIArgs:
@@ -133,30 +438,50 @@ def _parse_args(argv: list[str]) -> CLIArgs:
         action="store_true",
         help="Suppress summary output (errors still propagate)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the on-disk index of already-synced repositories",
+    )
+    parser.add_argument(
+        "--include-hidden",
+        action="store_true",
+        help="Also scan hidden directories and well-known build/tool directories",
+    )
     parsed = parser.parse_args(argv)
     root = cast("Path", parsed.root)
     template = cast("Path", parsed.template)
     dry_run = cast("bool", parsed.dry_run)
     quiet = cast("bool", parsed.quiet)
+    no_cache = cast("bool", parsed.no_cache)
+    include_hidden = cast("bool", parsed.include_hidden)
     return CLIArgs(
         root=root,
         template=template,
         dry_run=dry_run,
         quiet=quiet,
+        use_cache=not no_cache,
+        include_hidden=include_hidden,
     )
 
 
 def main(argv: list[str] | None = None) -> int:
     cli_argv = argv if argv is not None else sys.argv[1:]
     args = _parse_args(cli_argv)
-    root = Path(args.root).resolve()
-    template_path = Path(args.template).resolve()
+    # Resolve once and hand discovery a plain string; everything downstream
+    # (discovery, sync, index keys, SyncResult) works on str paths.
+    root = os.fspath(args.root.resolve())
+    template_path = args.template.resolve()
     dry_run = bool(args.dry_run)
     quiet = bool(args.quiet)
+    index_path = _default_index_path() if args.use_cache else None
 
     template = _load_template(template_path)
-    repos = _discover_repositories(root)
-    result = _sync_all(repos, template, dry_run=dry_run)
+    index = _load_index(index_path) if index_path is not None else None
+    repos = _discover_repositories(root, include_hidden=args.include_hidden)
+    result = _sync_all(repos, template, dry_run=dry_run, index=index)
+    if index_path is not None and index is not None and not dry_run:
+        _save_index(index_path, index)
 
     if not quiet:
         result.log()
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 # ruff: noqa: SLF001,S101 (tests intentionally exercise private helpers and use pytest-style asserts)
+import json
+import os
+import sys
 from typing import TYPE_CHECKING
 
+import pytest
+
 if TYPE_CHECKING:
     from pathlib import Path
 
@@ -18,13 +23,19 @@ def _make_repo(root: Path, name: str, *, gitignore: str | None = None) -> Path:
     return repo
 
 
+def _entry(repo: Path) -> sync._RepoEntry:
+    gitignore = repo / ".gitignore"
+    stat = gitignore.stat() if gitignore.exists() else None
+    return sync._RepoEntry(str(repo), stat, prefetched=True)
+
+
 def test_sync_creates_missing_gitignore(tmp_path: Path) -> None:
     template = "# example\n__pycache__/\n"
     repo = _make_repo(tmp_path, "sample")
 
-    result = sync._sync_all([repo], template, dry_run=False)
+    result = sync._sync_all([_entry(repo)], template, dry_run=False)
 
-    assert result.created == [repo]
+    assert result.created == [str(repo)]
     assert (repo / ".gitignore").read_text(encoding="utf-8") == template
 
 
@@ -32,9 +43,9 @@ def test_sync_updates_existing_gitignore(tmp_path: Path) -> None:
     template = "# canonical\n"
     repo = _make_repo(tmp_path, "existing", gitignore="# old\n")
 
-    result = sync._sync_all([repo], template, dry_run=False)
+    result = sync._sync_all([_entry(repo)], template, dry_run=False)
 
-    assert result.updated == [repo]
+    assert result.updated == [str(repo)]
     assert (repo / ".gitignore").read_text(encoding="utf-8") == template
 
 
@@ -42,9 +53,9 @@ def test_sync_dry_run_does_not_touch_disk(tmp_path: Path) -> None:
     template = "# canonical\n"
     repo = _make_repo(tmp_path, "dry", gitignore="# old\n")
 
-    result = sync._sync_all([repo], template, dry_run=True)
+    result = sync._sync_all([_entry(repo)], template, dry_run=True)
 
-    assert result.updated == [repo]
+    assert result.updated == [str(repo)]
     assert (repo / ".gitignore").read_text(encoding="utf-8") == "# old\n"
 
 
@@ -52,7 +63,278 @@ def test_discovery_includes_root_git_repo(tmp_path: Path) -> None:
     (tmp_path / ".git").mkdir()
     _make_repo(tmp_path, "child")
 
-    repos = sync._discover_repositories(tmp_path)
+    repos = [repo.path for repo in sync._discover_repositories(str(tmp_path))]
+
+    assert str(tmp_path) in repos
+    assert str(tmp_path / "child") in repos
+
+
+def test_sync_all_preserves_input_order(tmp_path: Path) -> None:
+    template = "# canonical\n"
+    repos = [_make_repo(tmp_path, f"repo{index:02d}") for index in range(12)]
+
+    result = sync._sync_all([_entry(repo) for repo in reversed(repos)], template, dry_run=False)
+
+    assert result.created == [str(repo) for repo in reversed(repos)]
+
+
+def test_sync_compares_contents_when_sizes_match(tmp_path: Path) -> None:
+    template = "# canonical\n"
+    same = _make_repo(tmp_path, "same", gitignore=template)
+    lookalike = _make_repo(tmp_path, "lookalike", gitignore="# CANONICAL\n")
+
+    result = sync._sync_all([_entry(same), _entry(lookalike)], template, dry_run=False)
+
+    assert result.unchanged_count == 1
+    assert result.updated == [str(lookalike)]
+
+
+def test_load_template_reloads_after_edit(tmp_path: Path) -> None:
+    template_path = tmp_path / "template.txt"
+    template_path.write_text("# first\n", encoding="utf-8")
+    assert sync._load_template(template_path) == "# first\n"
+
+    template_path.write_text("# second edit\n", encoding="utf-8")
+
+    assert sync._load_template(template_path) == "# second edit\n"
+
+
+def test_sync_index_skips_repositories_already_synced(tmp_path: Path) -> None:
+    template = "# canonical\n"
+    repo = _make_repo(tmp_path, "indexed")
+    index: dict[str, sync._IndexRecord] = {}
+
+    first = sync._sync_all([_entry(repo)], template, dry_run=False, index=index)
+    target = repo / ".gitignore"
+    stat = target.stat()
+    target.write_text("# CANONICAL\n", encoding="utf-8")
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    second = sync._sync_all([_entry(repo)], template, dry_run=False, index=index)
+
+    assert first.created == [str(repo)]
+    assert str(repo) in index
+    assert second.unchanged_count == 1
+    assert target.read_text(encoding="utf-8") == "# CANONICAL\n"
+
+
+def test_discovery_skips_hidden_and_tool_directories(tmp_path: Path) -> None:
+    _make_repo(tmp_path, "child")
+    _make_repo(tmp_path, ".hidden")
+    _make_repo(tmp_path, "node_modules")
+
+    default = [repo.path for repo in sync._discover_repositories(str(tmp_path))]
+    everything = [
+        repo.path for repo in sync._discover_repositories(str(tmp_path), include_hidden=True)
+    ]
+
+    assert default == [str(tmp_path / "child")]
+    assert sorted(everything) == sorted(
+        str(tmp_path / name) for name in ("child", ".hidden", "node_modules")
+    )
+
+
+def test_sync_all_stats_entries_that_were_not_prefetched(tmp_path: Path) -> None:
+    template = "# canonical\n"
+    bare = _make_repo(tmp_path, "bare")
+    _make_repo(tmp_path, "stale", gitignore="# old\n")
+
+    repos = [
+        sync._RepoEntry(str(bare), None, prefetched=False),
+        sync._RepoEntry(str(tmp_path / "stale"), None, prefetched=False),
+    ]
+    result = sync._sync_all(repos, template, dry_run=True)
+
+    assert result.created == [str(tmp_path / "bare")]
+    assert result.updated == [str(tmp_path / "stale")]
+
+
+def test_sync_compares_large_templates(tmp_path: Path) -> None:
+    template = "build/\n" * 1024
+    same = _make_repo(tmp_path, "same", gitignore=template)
+    lookalike = _make_repo(tmp_path, "lookalike", gitignore=template.replace("b", "B", 1))
+
+    result = sync._sync_all([_entry(same), _entry(lookalike)], template, dry_run=True)
+
+    assert result.unchanged_count == 1
+    assert result.updated == [str(lookalike)]
+
+
+def test_log_lists_changed_repositories(capsys: pytest.CaptureFixture[str]) -> None:
+    result = sync.SyncResult(created=["b", "a"], updated=["c"], unchanged_count=3)
+
+    result.log()
+
+    assert capsys.readouterr().out == (
+        "[gitignore-sync] created:\n  - a\n  - b\n[gitignore-sync] updated:\n  - c\n"
+    )
+
+
+def test_discovery_follows_symlinked_repositories(tmp_path: Path) -> None:
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    target = _make_repo(tmp_path, "elsewhere")
+    (workspace / "linked").symlink_to(target, target_is_directory=True)
+
+    repos = [repo.path for repo in sync._discover_repositories(str(workspace))]
+
+    assert repos == [str(workspace / "linked")]
+
+
+def test_probe_repo_uses_directory_listing_on_windows(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(sys, "platform", "win32")
+    bare = _make_repo(tmp_path, "bare")
+    synced = _make_repo(tmp_path, "synced", gitignore="# canonical\n")
+    plain = tmp_path / "plain"
+    plain.mkdir()
+
+    bare_entry = sync._probe_repo(str(bare))
+    synced_entry = sync._probe_repo(str(synced))
+
+    assert bare_entry == sync._RepoEntry(str(bare), None, prefetched=True)
+    assert synced_entry is not None
+    assert synced_entry.gitignore is not None
+    assert synced_entry.gitignore.st_size == len("# canonical\n")
+    assert sync._probe_repo(str(plain)) is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permission bits")
+def test_sync_creates_gitignore_honouring_umask(tmp_path: Path) -> None:
+    repo = _make_repo(tmp_path, "shared")
+    previous = os.umask(0o002)
+    try:
+        sync._sync_all(sync._discover_repositories(str(tmp_path)), "# canonical\n", dry_run=False)
+    finally:
+        os.umask(previous)
+
+    group_writable = 0o664
+    assert (repo / ".gitignore").stat().st_mode & 0o777 == group_writable
+
+
+def test_sync_treats_crlf_gitignore_as_matching(tmp_path: Path) -> None:
+    template = "# canonical\n__pycache__/\n"
+    repo = _make_repo(tmp_path, "autocrlf")
+    (repo / ".gitignore").write_bytes(template.replace("\n", "\r\n").encode("utf-8"))
+
+    result = sync._sync_all([_entry(repo)], template, dry_run=False)
+
+    assert result.unchanged_count == 1
+    assert (repo / ".gitignore").read_bytes() == template.replace("\n", "\r\n").encode("utf-8")
+
+
+def test_template_encodings_write_crlf_on_windows(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sys, "platform", "win32")
+
+    payload, accepted = sync._template_encodings(b"a\nb\n")
+
+    assert payload == b"a\r\nb\r\n"
+    assert accepted == (b"a\r\nb\r\n", b"a\nb\n")
+
+
+def test_sync_handles_large_gitignore_truncated_after_discovery(tmp_path: Path) -> None:
+    template = "build/\n" * 1024
+    repo = _make_repo(tmp_path, "truncated", gitignore=template)
+    stale = _entry(repo)
+    (repo / ".gitignore").write_bytes(b"")
+
+    result = sync._sync_all([stale], template, dry_run=True)
+
+    assert result.updated == [str(repo)]
+
+
+def test_sync_rewrites_gitignore_deleted_after_discovery(tmp_path: Path) -> None:
+    template = "# canonical\n"
+    repo = _make_repo(tmp_path, "deleted", gitignore=template)
+    stale = _entry(repo)
+    (repo / ".gitignore").unlink()
+
+    result = sync._sync_all([stale], template, dry_run=False)
+
+    assert result.updated == [str(repo)]
+    assert (repo / ".gitignore").read_text(encoding="utf-8") == template
+
+
+def test_load_index_treats_malformed_files_as_empty(tmp_path: Path) -> None:
+    garbled = tmp_path / "garbled.json"
+    garbled.write_text("{not json", encoding="utf-8")
+    listing = tmp_path / "listing.json"
+    listing.write_text("[1, 2, 3]", encoding="utf-8")
+
+    assert sync._load_index(garbled) == {}
+    assert sync._load_index(listing) == {}
+    assert sync._load_index(tmp_path / "missing.json") == {}
+
+
+def test_load_index_drops_mistyped_records(tmp_path: Path) -> None:
+    index_path = tmp_path / "index.json"
+    good: dict[str, object] = {"template_sha": "ab", "target_mtime_ns": 1, "target_size": 2}
+    bad: dict[str, object] = {"template_sha": "ab", "target_mtime_ns": "1", "target_size": 2}
+    stored: dict[str, dict[str, object]] = {"good": good, "bad": bad}
+    index_path.write_text(json.dumps(stored), encoding="utf-8")
+
+    assert sync._load_index(index_path) == {"good": good}
+
+
+def test_save_index_round_trips(tmp_path: Path) -> None:
+    index_path = tmp_path / "cache" / "index.json"
+    index = {
+        "repo": sync._IndexRecord(template_sha="ab", target_mtime_ns=1, target_size=2),
+    }
+
+    sync._save_index(index_path, index)
+
+    assert sync._load_index(index_path) == index
+    assert [path.name for path in index_path.parent.iterdir()] == ["index.json"]
+
+
+def test_save_index_removes_scratch_file_on_failure(tmp_path: Path) -> None:
+    index_path = tmp_path / "index.json"
+    index_path.mkdir()
+    index: dict[str, sync._IndexRecord] = {}
+
+    sync._save_index(index_path, index)
+
+    assert [path.name for path in tmp_path.iterdir()] == ["index.json"]
+
+
+def test_main_no_cache_neither_reads_nor_writes_index(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    template_path = tmp_path / "template.txt"
+    template_path.write_text("# canonical\n", encoding="utf-8")
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    repo = _make_repo(workspace, "stale", gitignore="# CANONICAL\n")
+    stat = (repo / ".gitignore").stat()
+    # A record claiming the stale file is already synced: honouring it would
+    # leave the file untouched.
+    index_path = sync._default_index_path()
+    index_path.parent.mkdir(parents=True)
+    index = {
+        str(repo): sync._IndexRecord(
+            template_sha=sync._digest(b"# canonical\n").hex(),
+            target_mtime_ns=stat.st_mtime_ns,
+            target_size=stat.st_size,
+        ),
+    }
+    index_path.write_text(json.dumps(index), encoding="utf-8")
+    before = index_path.read_text(encoding="utf-8")
+
+    exit_code = sync.main(
+        [
+            "--root",
+            str(workspace),
+            "--template",
+            str(template_path),
+            "--quiet",
+            "--no-cache",
+        ],
+    )
 
-    assert tmp_path in repos
-    assert tmp_path / "child" in repos
+    assert exit_code == 0
+    assert (repo / ".gitignore").read_text(encoding="utf-8") == "# canonical\n"
+    assert index_path.read_text(encoding="utf-8") == before
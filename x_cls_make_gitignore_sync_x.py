@@ -18,8 +18,8 @@ if TYPE_CHECKING:
 def main(argv: Sequence[str] | None = None) -> int:
     """Delegate to the sync CLI."""
 
-    args = list(argv) if argv is not None else list(sys.argv[1:])
-    return sync.main(args)
+    # sys.argv[1:] is already a fresh list and argparse never mutates it.
+    return sync.main(list(argv) if argv is not None else sys.argv[1:])
 
 
 if __name__ == "__main__":